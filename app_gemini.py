@@ -1,11 +1,43 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, abort, request, jsonify
 from flask_cors import CORS
 import google.generativeai as genai
 import os
 import json
+import bisect
+import gzip
+import hashlib
+import math
+import mimetypes
+import queue
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
 from dotenv import load_dotenv
 
-app = Flask(__name__)
+# Optional encoders: brotli for static assets and API bodies, MessagePack as
+# a compact alternative to JSON for API clients that ask for it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# File locking keeps workers from losing each other's log lines; without it
+# (e.g. on Windows) the shared logs are only safe with a single process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Static assets are served by serve_static() below, not Flask's default handler
+app = Flask(__name__, static_folder=None)
 CORS(app)
 
 # Configure Gemini API (load from .env)
@@ -20,393 +52,28 @@ else:
 # Initialize the model
 model = genai.GenerativeModel('gemini-2.0-flash')
 
-# HTML content embedded in the Python file
-HTML_CONTENT = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>AI Language Detection Chatbot</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            padding: 20px;
-        }
-
-        .container {
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-            padding: 40px;
-            max-width: 600px;
-            width: 100%;
-        }
-
-        h1 {
-            color: #333;
-            margin-bottom: 10px;
-            text-align: center;
-        }
-
-        .subtitle {
-            text-align: center;
-            color: #666;
-            margin-bottom: 30px;
-            font-size: 14px;
-        }
-
-        .badge {
-            display: inline-block;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 3px 10px;
-            border-radius: 12px;
-            font-size: 11px;
-            font-weight: 600;
-            margin-left: 5px;
-        }
-
-        .input-section {
-            margin-bottom: 30px;
-        }
-
-        label {
-            display: block;
-            margin-bottom: 10px;
-            color: #555;
-            font-weight: 600;
-        }
-
-        textarea {
-            width: 100%;
-            padding: 15px;
-            border: 2px solid #e0e0e0;
-            border-radius: 10px;
-            font-size: 16px;
-            font-family: inherit;
-            resize: vertical;
-            min-height: 100px;
-            transition: border-color 0.3s;
-        }
-
-        textarea:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-
-        button {
-            width: 100%;
-            padding: 15px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            border-radius: 10px;
-            font-size: 16px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: transform 0.2s, box-shadow 0.2s;
-        }
-
-        button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 5px 20px rgba(102, 126, 234, 0.4);
-        }
-
-        button:active {
-            transform: translateY(0);
-        }
-
-        button:disabled {
-            background: #ccc;
-            cursor: not-allowed;
-            transform: none;
-        }
-
-        .result-section {
-            margin-top: 30px;
-            padding: 20px;
-            background: #f8f9fa;
-            border-radius: 10px;
-            display: none;
-        }
-
-        .result-section.show {
-            display: block;
-            animation: fadeIn 0.5s;
-        }
-
-        @keyframes fadeIn {
-            from {
-                opacity: 0;
-                transform: translateY(10px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-
-        .result-item {
-            margin-bottom: 15px;
-        }
-
-        .result-label {
-            font-weight: 600;
-            color: #555;
-            margin-bottom: 5px;
-        }
-
-        .result-value {
-            padding: 10px;
-            background: white;
-            border-radius: 5px;
-            border-left: 4px solid #667eea;
-        }
-
-        .language-badge {
-            display: inline-block;
-            padding: 5px 15px;
-            border-radius: 20px;
-            font-weight: 600;
-            text-transform: uppercase;
-            font-size: 14px;
-        }
-
-        .language-sinhala {
-            background: #4CAF50;
-            color: white;
-        }
-
-        .language-english {
-            background: #2196F3;
-            color: white;
-        }
-
-        .language-singlish {
-            background: #FF9800;
-            color: white;
-        }
-
-        .language-mixed {
-            background: #9C27B0;
-            color: white;
-        }
-
-        .language-tamil {
-            background: #E91E63;
-            color: white;
-        }
-
-        .language-unknown {
-            background: #757575;
-            color: white;
-        }
-
-        .confidence-bar {
-            width: 100%;
-            height: 20px;
-            background: #e0e0e0;
-            border-radius: 10px;
-            overflow: hidden;
-            margin-top: 5px;
-        }
-
-        .confidence-fill {
-            height: 100%;
-            background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-            transition: width 0.5s ease;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-size: 12px;
-            font-weight: 600;
-        }
-
-        .error {
-            color: #f44336;
-            padding: 10px;
-            background: #ffebee;
-            border-radius: 5px;
-            margin-top: 10px;
-        }
-
-        .loader {
-            display: none;
-            text-align: center;
-            margin-top: 20px;
-        }
-
-        .loader.show {
-            display: block;
-        }
-
-        .spinner {
-            border: 3px solid #f3f3f3;
-            border-top: 3px solid #667eea;
-            border-radius: 50%;
-            width: 40px;
-            height: 40px;
-            animation: spin 1s linear infinite;
-            margin: 0 auto;
-        }
-
-        @keyframes spin {
-            0% { transform: rotate(0deg); }
-            100% { transform: rotate(360deg); }
-        }
-
-        .ai-note {
-            background: #e8f4f8;
-            border-left: 4px solid #2196F3;
-            padding: 10px;
-            border-radius: 5px;
-            margin-top: 10px;
-            font-size: 13px;
-            color: #555;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🤖 AI Language Detection Chatbot</h1>
-        <p class="subtitle">
-            Powered by Google Gemini <span class="badge">AI</span>
-        </p>
-
-        <div class="input-section">
-            <label for="userMessage">Enter your message:</label>
-            <textarea 
-                id="userMessage" 
-                placeholder="Type in any language: English, සිංහල, Singlish, தமிழ், or mixed..."
-            ></textarea>
-        </div>
-
-        <button id="detectBtn" onclick="detectLanguage()">🔍 Detect Language with AI</button>
-
-        <div class="loader" id="loader">
-            <div class="spinner"></div>
-            <p style="margin-top: 10px; color: #666;">AI is analyzing your message...</p>
-        </div>
-
-        <div class="result-section" id="resultSection">
-            <div class="result-item">
-                <div class="result-label">Your Message:</div>
-                <div class="result-value" id="userMessageDisplay"></div>
-            </div>
-
-            <div class="result-item">
-                <div class="result-label">Detected Language:</div>
-                <div class="result-value">
-                    <span class="language-badge" id="languageBadge"></span>
-                </div>
-            </div>
-
-            <div class="result-item">
-                <div class="result-label">Confidence Level:</div>
-                <div class="confidence-bar">
-                    <div class="confidence-fill" id="confidenceFill"></div>
-                </div>
-            </div>
-
-            <div class="result-item">
-                <div class="result-label">AI Analysis:</div>
-                <div class="result-value" id="analysisDisplay"></div>
-            </div>
-
-            <div class="ai-note">
-                💡 This detection is powered by Google's Gemini AI for maximum accuracy across all languages and mixed-language text.
-            </div>
-        </div>
-
-        <div class="error" id="errorMessage" style="display: none;"></div>
-    </div>
-
-    <script>
-        async function detectLanguage() {
-            const messageInput = document.getElementById('userMessage');
-            const message = messageInput.value.trim();
-            
-            document.getElementById('errorMessage').style.display = 'none';
-            document.getElementById('resultSection').classList.remove('show');
-            
-            if (!message) {
-                showError('Please enter a message!');
-                return;
-            }
-
-            document.getElementById('loader').classList.add('show');
-            document.getElementById('detectBtn').disabled = true;
-
-            try {
-                const response = await fetch('/api/detect', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ message: message })
-                });
-
-                const data = await response.json();
-
-                if (response.ok) {
-                    displayResults(data);
-                } else {
-                    showError(data.error || 'An error occurred');
-                }
-            } catch (error) {
-                showError('Failed to connect to the server. Please try again.');
-                console.error('Error:', error);
-            } finally {
-                document.getElementById('loader').classList.remove('show');
-                document.getElementById('detectBtn').disabled = false;
-            }
-        }
-
-        function displayResults(data) {
-            document.getElementById('userMessageDisplay').textContent = data.user_message;
-
-            const badge = document.getElementById('languageBadge');
-            badge.textContent = data.detected_language;
-            badge.className = 'language-badge language-' + data.detected_language.toLowerCase();
-
-            const confidenceFill = document.getElementById('confidenceFill');
-            confidenceFill.style.width = data.confidence + '%';
-            confidenceFill.textContent = data.confidence.toFixed(0) + '%';
-
-            document.getElementById('analysisDisplay').textContent = data.analysis;
-
-            document.getElementById('resultSection').classList.add('show');
-        }
-
-        function showError(message) {
-            const errorDiv = document.getElementById('errorMessage');
-            errorDiv.textContent = message;
-            errorDiv.style.display = 'block';
-        }
-
-        document.getElementById('userMessage').addEventListener('keydown', function(e) {
-            if (e.key === 'Enter' && !e.shiftKey) {
-                e.preventDefault();
-                detectLanguage();
-            }
-        });
-    </script>
-</body>
-</html>
-"""
+# Self-training settings: confident Gemini answers are appended to a JSONL log
+# and distilled into a local character n-gram classifier that answers
+# requests it is sure about without calling the API.
+TRAINING_LOG_PATH = os.environ.get('TRAINING_LOG_PATH', 'training_log.jsonl')
+TRAINING_MIN_CONFIDENCE = float(os.environ.get('TRAINING_MIN_CONFIDENCE', '90'))
+TRAINING_LOG_MAX_ENTRIES = int(os.environ.get('TRAINING_LOG_MAX_ENTRIES', '20000'))
+TRAINING_LOG_MAX_AGE_DAYS = float(os.environ.get('TRAINING_LOG_MAX_AGE_DAYS', '30'))
+LOCAL_MIN_EXAMPLES = int(os.environ.get('LOCAL_MIN_EXAMPLES', '200'))
+LOCAL_MIN_CLASS_EXAMPLES = int(os.environ.get('LOCAL_MIN_CLASS_EXAMPLES', '30'))
+LOCAL_MIN_CONFIDENCE = float(os.environ.get('LOCAL_MIN_CONFIDENCE', '95'))
+LOCAL_MAX_UNSEEN_RATIO = float(os.environ.get('LOCAL_MAX_UNSEEN_RATIO', '0.3'))
+LOCAL_MIN_MARGIN = float(os.environ.get('LOCAL_MIN_MARGIN', '0.1'))
+LOCAL_AUDIT_RATE = float(os.environ.get('LOCAL_AUDIT_RATE', '0.05'))
+RETRAIN_INTERVAL_SECONDS = int(os.environ.get('RETRAIN_INTERVAL_SECONDS', '300'))
+STATS_LOG_PATH = os.environ.get('STATS_LOG_PATH', 'answer_stats.jsonl')
+STATS_RETENTION_DAYS = float(os.environ.get('STATS_RETENTION_DAYS', '30'))
+STATS_FLUSH_SECONDS = int(os.environ.get('STATS_FLUSH_SECONDS', '60'))
+
+# Response compression settings
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+API_COMPRESS_MIN_BYTES = int(os.environ.get('API_COMPRESS_MIN_BYTES', '200'))
+MSGPACK_MIMETYPE = 'application/x-msgpack'
 
 def detect_language_with_gemini(text):
     """
@@ -473,9 +140,577 @@ Return ONLY the JSON object, nothing else."""
             'analysis': f'Error: {str(e)}'
         }
 
+class NgramLanguageModel:
+    """
+    Naive Bayes classifier over character 1-3 grams, trained from the
+    labeled examples in the training log.
+
+    Raw Naive Bayes posteriors are close to 100% for almost any input, so
+    predict() reports a calibrated confidence instead: the accuracy the
+    model achieved on held-out examples it scored at least as decisively.
+    """
+
+    # Minimum number of held-out examples behind any confidence estimate
+    MIN_CALIBRATION_SUPPORT = 20
+
+    def __init__(self, examples, min_class_examples=1, max_unseen_ratio=1.0, min_margin=0.0):
+        self.ngram_counts = defaultdict(Counter)
+        self.ngram_totals = Counter()
+        self.doc_counts = Counter()
+        self.vocabulary = set()
+        self.max_unseen_ratio = max_unseen_ratio
+        self.min_margin = min_margin
+
+        for text, language in examples:
+            grams = self._ngrams(text)
+            self.ngram_counts[language].update(grams)
+            self.ngram_totals[language] += len(grams)
+            self.doc_counts[language] += 1
+            self.vocabulary.update(grams)
+
+        self.example_count = sum(self.doc_counts.values())
+        # Rare labels have tiny n-gram totals, which inflates their scores for
+        # unseen text, so only well-represented labels take part in scoring
+        self.languages = sorted(
+            language for language, docs in self.doc_counts.items()
+            if docs >= min_class_examples
+        )
+        self._calibration_margins = []
+        self._calibration_correct = [0]
+
+    @staticmethod
+    def _ngrams(text):
+        padded = f" {text.lower().strip()} "
+        return [padded[i:i + n] for n in (1, 2, 3) for i in range(len(padded) - n + 1)]
+
+    def score(self, text):
+        """
+        Return (language, margin) where margin is the per-n-gram log-likelihood
+        gap between the best and second-best label, or (None, 0.0) if the
+        model cannot tell the text apart.
+        """
+        grams = self._ngrams(text)
+        if len(self.languages) < 2 or not grams:
+            return None, 0.0
+
+        trigrams = [gram for gram in grams if len(gram) == 3]
+        unseen = sum(1 for gram in trigrams if gram not in self.vocabulary)
+        if trigrams and unseen / len(trigrams) > self.max_unseen_ratio:
+            return None, 0.0
+
+        vocab_size = len(self.vocabulary) + 1
+        known_docs = sum(self.doc_counts[language] for language in self.languages)
+        scores = {}
+        for language in self.languages:
+            counts = self.ngram_counts[language]
+            denominator = self.ngram_totals[language] + vocab_size
+            score = math.log(self.doc_counts[language] / known_docs)
+            for gram in grams:
+                score += math.log((counts[gram] + 1) / denominator)
+            scores[language] = score
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        margin = (scores[ranked[0]] - scores[ranked[1]]) / len(grams)
+        return ranked[0], margin
+
+    def calibrate(self, held_out):
+        """
+        Record how accurate the model is on held-out (text, language) pairs
+        at each margin, for use by predict().
+        """
+        results = []
+        for text, language in held_out:
+            predicted, margin = self.score(text)
+            if predicted is not None:
+                results.append((margin, predicted == language))
+        results.sort(key=lambda result: result[0], reverse=True)
+
+        # Negated so the list is ascending and searchable with bisect
+        self._calibration_margins = [-margin for margin, _ in results]
+        self._calibration_correct = [0]
+        for _, correct in results:
+            self._calibration_correct.append(self._calibration_correct[-1] + correct)
+
+    def predict(self, text):
+        """
+        Return (language, confidence 0-100) for the text, or (None, 0) if
+        the model cannot answer or has not been calibrated.
+        """
+        language, margin = self.score(text)
+        # Text close to two labels at once is usually mixed-language
+        if (language is None or margin < self.min_margin
+                or len(self._calibration_margins) < self.MIN_CALIBRATION_SUPPORT):
+            return None, 0
+
+        # Held-out examples scored at least this decisively, padded up to the
+        # minimum support so a handful of easy examples cannot vouch alone
+        supported = bisect.bisect_right(self._calibration_margins, -margin)
+        supported = max(supported, self.MIN_CALIBRATION_SUPPORT)
+        return language, 100.0 * self._calibration_correct[supported] / supported
+
+
+# Current local model; replaced wholesale by the trainer so request threads
+# always see either the old or the new model, never a half-built one.
+local_model = NgramLanguageModel([])
+# Bounded so examples are dropped rather than piling up if the worker stalls
+_training_queue = queue.Queue(maxsize=1000)
+_self_training_lock = threading.Lock()
+_self_training_started = False
+
+# Answer counts not yet flushed to the stats log, keyed by (hour, field)
+_stats_lock = threading.Lock()
+_pending_stats = Counter()
+STATS_FIELDS = ('local', 'gemini', 'audited', 'audit_agreed')
+
+
+@contextmanager
+def _locked(path):
+    """
+    Hold an exclusive lock on a shared log across all worker processes.
+    Every append and every read-and-rewrite of the log must hold it.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _append_jsonl(path, entries):
+    """
+    Append entries to a shared JSONL file.
+    """
+    with _locked(path), open(path, 'a', encoding='utf-8') as out_file:
+        for entry in entries:
+            out_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def _rewrite_jsonl(path, entries):
+    """
+    Atomically replace a JSONL file with the given entries. The caller must
+    hold _locked(path).
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as out_file:
+            for entry in entries:
+                out_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _read_jsonl(path):
+    """
+    Read entries from a JSONL file, returning them and the number of lines read.
+    """
+    entries = []
+    lines = 0
+    if not os.path.exists(path):
+        return entries, lines
+
+    with open(path, encoding='utf-8') as log_file:
+        for line in log_file:
+            lines += 1
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Skip lines truncated by a concurrent writer or crash
+                continue
+    return entries, lines
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def load_training_log():
+    """
+    Read the training log, dropping entries past the age or size limit.
+    The file is rewritten when anything was dropped, so stored user
+    messages never outlive TRAINING_LOG_MAX_AGE_DAYS.
+    """
+    cutoff = time.time() - TRAINING_LOG_MAX_AGE_DAYS * 86400
+    with _locked(TRAINING_LOG_PATH):
+        entries, lines = _read_jsonl(TRAINING_LOG_PATH)
+        kept = [
+            entry for entry in entries
+            if isinstance(entry, dict)
+            and isinstance(entry.get('text'), str)
+            and isinstance(entry.get('language'), str)
+            and _is_number(entry.get('timestamp')) and entry['timestamp'] >= cutoff
+        ]
+        kept = kept[-TRAINING_LOG_MAX_ENTRIES:]
+
+        if len(kept) != lines:
+            try:
+                _rewrite_jsonl(TRAINING_LOG_PATH, kept)
+            except OSError as e:
+                print(f"Error trimming training log: {e}")
+    return kept
+
+
+def split_held_out(examples):
+    """
+    Split (text, language) pairs into training and held-out sets. The split
+    is by a hash of the text, so repeated messages always land on the same
+    side and cannot inflate the calibrated accuracy.
+    """
+    training, held_out = [], []
+    for text, language in examples:
+        bucket = hashlib.sha256(text.encode('utf-8')).digest()[0] % 5
+        (held_out if bucket == 0 else training).append((text, language))
+    return training, held_out
+
+
+def retrain_local_model():
+    """
+    Rebuild the local model from the training log and hot-swap it in.
+    About a fifth of the messages are held out to calibrate the model's
+    confidence.
+    """
+    global local_model
+    examples = [(entry['text'], entry['language']) for entry in load_training_log()]
+    training, held_out = split_held_out(examples)
+
+    new_model = NgramLanguageModel(training, LOCAL_MIN_CLASS_EXAMPLES,
+                                   LOCAL_MAX_UNSEEN_RATIO, LOCAL_MIN_MARGIN)
+    new_model.calibrate(held_out)
+    local_model = new_model
+    print(f"Local model retrained on {new_model.example_count} examples "
+          f"({len(held_out)} held out, languages: {', '.join(new_model.languages) or 'none'})")
+    return new_model
+
+
+def record_training_example(text, result):
+    """
+    Queue a confident Gemini answer for the training log.
+    """
+    if result['language'] in ('unknown', 'other'):
+        return
+    if result['confidence'] < TRAINING_MIN_CONFIDENCE:
+        return
+    try:
+        _training_queue.put_nowait({
+            'text': text,
+            'language': result['language'],
+            'confidence': result['confidence'],
+            'timestamp': time.time()
+        })
+    except queue.Full:
+        pass
+
+
+def record_answer_stat(field):
+    """
+    Count a request outcome (see STATS_FIELDS) in the current hour.
+    """
+    hour = int(time.time() // 3600) * 3600
+    with _stats_lock:
+        _pending_stats[(hour, field)] += 1
+
+
+def flush_answer_stats():
+    """
+    Append this process's pending counts to the shared stats log.
+    """
+    with _stats_lock:
+        pending = dict(_pending_stats)
+        _pending_stats.clear()
+    if not pending:
+        return
+
+    buckets = defaultdict(dict)
+    for (hour, field), count in pending.items():
+        buckets[hour][field] = count
+    try:
+        _append_jsonl(STATS_LOG_PATH, [dict(buckets[hour], hour=hour) for hour in sorted(buckets)])
+    except OSError as e:
+        print(f"Error writing stats log: {e}")
+        with _stats_lock:
+            _pending_stats.update(pending)
+
+
+def load_answer_stats(compact=False):
+    """
+    Aggregate the stats log from all workers, plus this process's unflushed
+    counts, into hourly buckets within STATS_RETENTION_DAYS. With compact,
+    the log is rewritten as one line per hour.
+    """
+    cutoff = time.time() - STATS_RETENTION_DAYS * 86400
+    with _locked(STATS_LOG_PATH) if compact else nullcontext():
+        entries, lines = _read_jsonl(STATS_LOG_PATH)
+        hourly = defaultdict(Counter)
+        for entry in entries:
+            if not isinstance(entry, dict) or not _is_number(entry.get('hour')):
+                continue
+            counts = {field: entry.get(field, 0) for field in STATS_FIELDS}
+            if entry['hour'] >= cutoff and all(isinstance(count, int) for count in counts.values()):
+                hourly[entry['hour']].update(counts)
+
+        if compact and len(hourly) != lines:
+            try:
+                _rewrite_jsonl(STATS_LOG_PATH, [dict(hourly[hour], hour=hour) for hour in sorted(hourly)])
+            except OSError as e:
+                print(f"Error compacting stats log: {e}")
+
+    with _stats_lock:
+        for (hour, field), count in _pending_stats.items():
+            hourly[hour][field] += count
+    return hourly
+
+
+def _training_worker():
+    """
+    Background loop: train from the existing log, then append queued
+    examples to it, flush answer stats and periodically retrain. Every
+    worker process runs its own loop, so retrained models reach all
+    workers without a restart.
+    """
+    last_trained = 0
+    last_flushed = time.time()
+    while True:
+        try:
+            entry = _training_queue.get(timeout=1)
+            _append_jsonl(TRAINING_LOG_PATH, [entry])
+        except queue.Empty:
+            pass
+        except OSError as e:
+            print(f"Error writing training log: {e}")
+
+        if time.time() - last_flushed >= STATS_FLUSH_SECONDS:
+            last_flushed = time.time()
+            flush_answer_stats()
+
+        if time.time() - last_trained >= RETRAIN_INTERVAL_SECONDS:
+            last_trained = time.time()
+            try:
+                retrain_local_model()
+                load_answer_stats(compact=True)
+            except Exception as e:
+                print(f"Error retraining local model: {e}")
+
+
+def init_self_training():
+    """
+    Start the background worker, which trains the local model from the
+    existing log. Safe to call more than once; only the first call does
+    anything.
+    """
+    global _self_training_started
+    with _self_training_lock:
+        if _self_training_started:
+            return
+        threading.Thread(target=_training_worker, daemon=True).start()
+        _self_training_started = True
+
+
+def detect_language(text, use_gemini=True):
+    """
+    Answer from the local model when it is confident enough, otherwise ask
+    Gemini and keep its answer as a training example. A share of confident
+    local answers is still sent to Gemini to audit local accuracy.
+    Returns None if the local model cannot answer and use_gemini is False.
+    """
+    current_model = local_model
+    local_result = None
+    if current_model.example_count >= LOCAL_MIN_EXAMPLES:
+        language, confidence = current_model.predict(text)
+        if language and confidence >= LOCAL_MIN_CONFIDENCE:
+            local_result = {
+                'language': language,
+                'confidence': confidence,
+                'analysis': f'Detected locally by a character n-gram model trained on {current_model.example_count} AI-labeled examples.',
+                'source': 'local'
+            }
+
+    if local_result and not (use_gemini and random.random() < LOCAL_AUDIT_RATE):
+        record_answer_stat('local')
+        return local_result
+    if not use_gemini:
+        return None
+
+    result = detect_language_with_gemini(text)
+    record_answer_stat('gemini')
+    if local_result:
+        record_answer_stat('audited')
+        if result['language'] == local_result['language']:
+            record_answer_stat('audit_agreed')
+    record_training_example(text, result)
+    result['source'] = 'gemini'
+    return result
+
+
+@app.before_request
+def start_self_training():
+    init_self_training()
+
+
+def _build_static_asset(filename, body):
+    """
+    Pre-compress an asset once and compute its strong ETag.
+    """
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    # Each encoding is a distinct representation, so each gets its own ETag
+    encodings = {'identity': (body, digest)}
+    encodings['gzip'] = (gzip.compress(body, compresslevel=9, mtime=0), f'{digest}-gz')
+    if brotli:
+        encodings['br'] = (brotli.compress(body, quality=11), f'{digest}-br')
+
+    return {'digest': digest, 'mimetype': mimetype, 'encodings': encodings}
+
+
+# src/href attribute values in index.html, with or without quotes
+ASSET_REFERENCE_PATTERN = re.compile(r"""\b(src|href)(\s*=\s*)(["']?)([^"'\s>]+)\3""", re.IGNORECASE)
+
+
+def load_static_assets(static_dir=STATIC_DIR):
+    """
+    Load and pre-compress the UI assets, including those in subdirectories.
+    index.html references the other assets with a content hash in the URL
+    so they can be cached forever. Assets it does not reference (favicons,
+    fonts or images used from CSS) are still served, but must be revalidated.
+    """
+    assets = {}
+    for directory, subdirectories, filenames in os.walk(static_dir):
+        # Skip hidden directories and files, and editor backups
+        subdirectories[:] = sorted(name for name in subdirectories if not name.startswith('.'))
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            if (name == 'index.html' or not os.path.isfile(path)
+                    or filename.startswith('.') or filename.endswith('~')):
+                continue
+            with open(path, 'rb') as asset_file:
+                assets[name] = _build_static_asset(name, asset_file.read())
+
+    with open(os.path.join(static_dir, 'index.html'), encoding='utf-8') as index_file:
+        html = index_file.read()
+
+    referenced = set()
+
+    def add_version(match):
+        attribute, equals, quote, url = match.groups()
+        path = url.split('?', 1)[0].split('#', 1)[0]
+        if path.startswith('./'):
+            path = path[2:]
+        filename = path.lstrip('/')
+        if not filename.startswith('static/') or filename[len('static/'):] not in assets:
+            return match.group(0)
+        filename = filename[len('static/'):]
+        referenced.add(filename)
+        return f'{attribute}{equals}{quote}/static/{filename}?v={assets[filename]["digest"]}{quote}'
+
+    html = ASSET_REFERENCE_PATTERN.sub(add_version, html)
+    unreferenced = sorted(set(assets) - referenced)
+    if unreferenced:
+        print(f"Warning: static assets not referenced from index.html will be served "
+              f"without long-lived caching: {', '.join(unreferenced)}")
+
+    assets['index.html'] = _build_static_asset('index.html', html.encode('utf-8'))
+    return assets
+
+
+STATIC_ASSETS = load_static_assets()
+
+
+def _negotiate_encoding(available):
+    """
+    Pick the best Content-Encoding the client accepts, or 'identity'.
+    """
+    preferred = [encoding for encoding in ('br', 'gzip') if encoding in available]
+    return request.accept_encodings.best_match(preferred) or 'identity'
+
+
+def serve_static_asset(filename, cache_control):
+    """
+    Serve a pre-compressed asset, answering 304 when the client's copy is current.
+    """
+    asset = STATIC_ASSETS.get(filename)
+    if asset is None:
+        abort(404)
+
+    encoding = _negotiate_encoding(asset['encodings'])
+    body, etag = asset['encodings'][encoding]
+    etags = [tag for _, tag in asset['encodings'].values()]
+
+    if any(request.if_none_match.contains(tag) for tag in etags):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=asset['mimetype'])
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def make_api_response(payload):
+    """
+    Encode an API payload as MessagePack if the client explicitly asks for
+    it and msgpack is installed, otherwise as JSON.
+    """
+    if msgpack and request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE:
+        response = Response(msgpack.packb(payload, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(payload)
+    response.vary.add('Accept')
+    return response
+
+
+@app.after_request
+def compress_api_response(response):
+    """
+    Compress large API responses with the best encoding the client accepts.
+    """
+    if (not request.path.startswith('/api/')
+            or response.direct_passthrough
+            or response.status_code < 200 or response.status_code == 204
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    if len(body) < API_COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding(['br', 'gzip'] if brotli else ['gzip'])
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=4))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(body, compresslevel=6))
+    else:
+        return response
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
 @app.route('/')
 def index():
-    return HTML_CONTENT
+    # The page itself must be revalidated so new asset URLs are picked up
+    return serve_static_asset('index.html', 'no-cache')
+
+@app.route('/static/<path:filename>')
+def serve_static(filename):
+    """
+    Serve UI assets. Only URLs carrying the current content hash are cached
+    forever; anything else must be revalidated.
+    """
+    asset = STATIC_ASSETS.get(filename)
+    if asset is None or filename == 'index.html':
+        abort(404)
+    if request.args.get('v') == asset['digest']:
+        return serve_static_asset(filename, 'public, max-age=31536000, immutable')
+    return serve_static_asset(filename, 'no-cache')
 
 @app.route('/api/detect', methods=['POST'])
 def detect():
@@ -496,24 +731,24 @@ def detect():
             'error': 'Message cannot be empty'
         }), 400
     
-    # Check if API key is configured
-    if not GEMINI_API_KEY:
+    # Detect language locally if confident, otherwise using Gemini. Without
+    # an API key only the local model can answer.
+    detection_result = detect_language(user_message, use_gemini=bool(GEMINI_API_KEY))
+    if detection_result is None:
         return jsonify({
             'error': 'Gemini API key not configured. Please copy env.example to .env and set GEMINI_API_KEY or export it in your environment.'
         }), 500
     
-    # Detect language using Gemini
-    detection_result = detect_language_with_gemini(user_message)
-    
     # Prepare response
     response = {
         'user_message': user_message,
         'detected_language': detection_result['language'],
         'confidence': detection_result['confidence'],
-        'analysis': detection_result['analysis']
+        'analysis': detection_result['analysis'],
+        'source': detection_result['source']
     }
     
-    return jsonify(response)
+    return make_api_response(response)
 
 @app.route('/api/health', methods=['GET'])
 def health():
@@ -526,6 +761,40 @@ def health():
         'gemini_api_configured': api_configured
     })
 
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """
+    Share of requests answered by the local model, overall and per hour,
+    aggregated across all workers sharing STATS_LOG_PATH. Other workers'
+    counts lag by up to STATS_FLUSH_SECONDS.
+    """
+    hourly = load_answer_stats()
+    totals = Counter()
+    buckets = []
+    for hour in sorted(hourly):
+        counts = hourly[hour]
+        totals.update(counts)
+        answered = counts['local'] + counts['gemini']
+        buckets.append({
+            'hour': hour,
+            'local': counts['local'],
+            'gemini': counts['gemini'],
+            'local_share': counts['local'] / answered if answered else 0
+        })
+
+    total = totals['local'] + totals['gemini']
+    return make_api_response({
+        'local_model_examples': local_model.example_count,
+        'local_model_languages': local_model.languages,
+        'total_requests': total,
+        'local_requests': totals['local'],
+        'local_share': totals['local'] / total if total else 0,
+        'audited_requests': totals['audited'],
+        'local_accuracy': totals['audit_agreed'] / totals['audited'] if totals['audited'] else None,
+        'retention_days': STATS_RETENTION_DAYS,
+        'hourly': buckets
+    })
+
 if __name__ == '__main__':
     print("=" * 60)
     print("AI Language Detection Chatbot - Starting Server")
@@ -0,0 +1,26 @@
+import queue
+from collections import Counter
+
+import pytest
+
+import app_gemini
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """
+    app_gemini with its logs in a temporary directory, an untrained local
+    model and the background worker disabled.
+    """
+    monkeypatch.setattr(app_gemini, 'TRAINING_LOG_PATH', str(tmp_path / 'training_log.jsonl'))
+    monkeypatch.setattr(app_gemini, 'STATS_LOG_PATH', str(tmp_path / 'answer_stats.jsonl'))
+    monkeypatch.setattr(app_gemini, '_self_training_started', True)
+    monkeypatch.setattr(app_gemini, 'local_model', app_gemini.NgramLanguageModel([]))
+    monkeypatch.setattr(app_gemini, '_training_queue', queue.Queue())
+    monkeypatch.setattr(app_gemini, '_pending_stats', Counter())
+    return app_gemini
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,72 @@
+async function detectLanguage() {
+    const messageInput = document.getElementById('userMessage');
+    const message = messageInput.value.trim();
+    
+    document.getElementById('errorMessage').style.display = 'none';
+    document.getElementById('resultSection').classList.remove('show');
+    
+    if (!message) {
+        showError('Please enter a message!');
+        return;
+    }
+
+    document.getElementById('loader').classList.add('show');
+    document.getElementById('detectBtn').disabled = true;
+
+    try {
+        const response = await fetch('/api/detect', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ message: message })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            displayResults(data);
+        } else {
+            showError(data.error || 'An error occurred');
+        }
+    } catch (error) {
+        showError('Failed to connect to the server. Please try again.');
+        console.error('Error:', error);
+    } finally {
+        document.getElementById('loader').classList.remove('show');
+        document.getElementById('detectBtn').disabled = false;
+    }
+}
+
+function displayResults(data) {
+    document.getElementById('userMessageDisplay').textContent = data.user_message;
+
+    const badge = document.getElementById('languageBadge');
+    badge.textContent = data.detected_language;
+    badge.className = 'language-badge language-' + data.detected_language.toLowerCase();
+
+    const confidenceFill = document.getElementById('confidenceFill');
+    confidenceFill.style.width = data.confidence + '%';
+    confidenceFill.textContent = data.confidence.toFixed(0) + '%';
+
+    document.getElementById('analysisDisplay').textContent = data.analysis;
+
+    document.getElementById('sourceNote').textContent = data.source === 'local'
+        ? '⚡ Answered instantly by the local model, trained on earlier Gemini AI answers.'
+        : "💡 This detection is powered by Google's Gemini AI for maximum accuracy across all languages and mixed-language text.";
+
+    document.getElementById('resultSection').classList.add('show');
+}
+
+function showError(message) {
+    const errorDiv = document.getElementById('errorMessage');
+    errorDiv.textContent = message;
+    errorDiv.style.display = 'block';
+}
+
+document.getElementById('userMessage').addEventListener('keydown', function(e) {
+    if (e.key === 'Enter' && !e.shiftKey) {
+        e.preventDefault();
+        detectLanguage();
+    }
+});
@@ -0,0 +1,283 @@
+"""
+Unit tests for the self-training local detector. Gemini is always mocked.
+"""
+
+import json
+import random
+import time
+from unittest import mock
+
+import pytest
+
+ENGLISH_WORDS = [
+    'hello', 'how', 'are', 'you', 'today', 'the', 'weather', 'is', 'nice',
+    'good', 'morning', 'everyone', 'thank', 'very', 'much', 'where', 'going',
+    'we', 'will', 'see', 'this', 'evening', 'please', 'come', 'home'
+]
+SINGLISH_WORDS = [
+    'kohomada', 'oyata', 'mama', 'hondai', 'sthuthi', 'api', 'yanawa',
+    'gedara', 'ayya', 'meka', 'balanna', 'amma', 'enne', 'nadda', 'machan',
+    'mokada', 'karanne', 'awa', 'nangi', 'giyada', 'puluwanda', 'enna'
+]
+
+
+def make_examples(words, language, count, seed):
+    rng = random.Random(seed)
+    return [(' '.join(rng.choice(words) for _ in range(rng.randint(3, 7))), language)
+            for _ in range(count)]
+
+
+def train(app_module, examples):
+    """
+    Write examples to the training log and retrain from it.
+    """
+    now = time.time()
+    with open(app_module.TRAINING_LOG_PATH, 'w', encoding='utf-8') as log_file:
+        for text, language in examples:
+            log_file.write(json.dumps({'text': text, 'language': language,
+                                       'confidence': 99, 'timestamp': now}) + '\n')
+    return app_module.retrain_local_model()
+
+
+@pytest.fixture
+def bilingual_examples():
+    return (make_examples(ENGLISH_WORDS, 'english', 150, seed=1)
+            + make_examples(SINGLISH_WORDS, 'singlish', 150, seed=2))
+
+
+def gemini_answer(language, confidence=97):
+    return {'language': language, 'confidence': confidence, 'analysis': 'mocked'}
+
+
+def test_predict_is_confident_on_familiar_text(app_module, bilingual_examples):
+    model = train(app_module, bilingual_examples)
+
+    assert model.predict('mama gedara yanawa machan') == ('singlish', pytest.approx(100.0))
+    language, confidence = model.predict('good morning, how are you')
+    assert language == 'english'
+    assert confidence >= app_module.LOCAL_MIN_CONFIDENCE
+
+
+def test_predict_ignores_rare_classes(app_module, bilingual_examples):
+    model = train(app_module, bilingual_examples + [('mama fine thank you', 'mixed')])
+
+    assert 'mixed' not in model.languages
+    for text in ['bonjour tout le monde', 'xyz']:
+        assert model.predict(text) == (None, 0)
+
+
+def test_predict_rejects_unfamiliar_script(app_module, bilingual_examples):
+    model = train(app_module, bilingual_examples)
+
+    assert model.predict('ආයුබෝවන් ඔබට') == (None, 0)
+    assert model.predict('வணக்கம், எப்படி இருக்கிறீர்கள்?') == (None, 0)
+
+
+def test_predict_rejects_mixed_text(app_module, bilingual_examples):
+    model = train(app_module, bilingual_examples)
+
+    assert model.predict('hello machan kohomada how are you') == (None, 0)
+
+
+def test_single_class_model_never_answers(app_module):
+    model = train(app_module, make_examples(ENGLISH_WORDS, 'english', 250, seed=3))
+
+    assert model.predict('hello how are you') == (None, 0)
+    assert model.predict('ආයුබෝවන් ඔබට') == (None, 0)
+
+
+def test_uncalibrated_model_never_answers(app_module, bilingual_examples):
+    model = app_module.NgramLanguageModel(bilingual_examples)
+
+    assert model.score('hello how are you')[0] == 'english'
+    assert model.predict('hello how are you') == (None, 0)
+
+
+def test_calibrated_confidence_reflects_held_out_accuracy(app_module, bilingual_examples):
+    model = app_module.NgramLanguageModel(bilingual_examples)
+    # Held-out labels are all wrong, so no margin can be trusted
+    model.calibrate([(text, 'english' if language == 'singlish' else 'singlish')
+                     for text, language in bilingual_examples[::5]])
+
+    assert model.predict('hello how are you') == ('english', 0.0)
+
+
+def test_predict_needs_minimum_calibration_support(app_module, bilingual_examples):
+    model = app_module.NgramLanguageModel(bilingual_examples)
+    model.calibrate([('hello how are you', 'english'), ('mama gedara yanawa', 'singlish')])
+
+    assert model.predict('hello how are you') == (None, 0)
+
+
+def test_split_held_out_keeps_duplicates_together(app_module, bilingual_examples):
+    training, held_out = app_module.split_held_out(bilingual_examples * 3)
+
+    assert held_out
+    assert not {text for text, _ in training} & {text for text, _ in held_out}
+
+
+@pytest.mark.parametrize('result', [
+    gemini_answer('english', confidence=50),
+    gemini_answer('unknown', confidence=99),
+    gemini_answer('other', confidence=99),
+])
+def test_record_training_example_skips_unusable_answers(app_module, result):
+    app_module.record_training_example('some text', result)
+
+    assert app_module._training_queue.empty()
+
+
+def test_record_training_example_queues_confident_answers(app_module):
+    app_module.record_training_example('kohomada oyata', gemini_answer('singlish'))
+
+    entry = app_module._training_queue.get_nowait()
+    assert entry['text'] == 'kohomada oyata'
+    assert entry['language'] == 'singlish'
+
+
+def test_training_log_is_trimmed_by_age_and_size(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'TRAINING_LOG_MAX_ENTRIES', 2)
+    now = time.time()
+    entries = [
+        {'text': 'old', 'language': 'english', 'timestamp': now - 90 * 86400},
+        {'text': 'a', 'language': 'english', 'timestamp': now},
+        {'text': 'b', 'language': 'english', 'timestamp': now},
+        {'text': 'c', 'language': 'english', 'timestamp': now},
+    ]
+    with open(app_module.TRAINING_LOG_PATH, 'w', encoding='utf-8') as log_file:
+        for entry in entries:
+            log_file.write(json.dumps(entry) + '\n')
+
+    assert [entry['text'] for entry in app_module.load_training_log()] == ['b', 'c']
+    with open(app_module.TRAINING_LOG_PATH, encoding='utf-8') as log_file:
+        assert [json.loads(line)['text'] for line in log_file] == ['b', 'c']
+
+
+def test_training_log_skips_malformed_entries(app_module, tmp_path):
+    valid = {'text': 'kohomada', 'language': 'singlish', 'timestamp': time.time()}
+    with open(app_module.TRAINING_LOG_PATH, 'w', encoding='utf-8') as log_file:
+        for line in ['123', '"text and language"', '[1, 2]', '{"text": 5, "language": "english"}',
+                     '{"text": "hi", "language": "english", "timestamp": "now"}',
+                     '{"text": "trunc', json.dumps(valid)]:
+            log_file.write(line + '\n')
+
+    # Retraining must not fail on malformed lines
+    app_module.retrain_local_model()
+    assert app_module.load_training_log() == [valid]
+    with open(app_module.TRAINING_LOG_PATH, encoding='utf-8') as log_file:
+        assert [json.loads(line) for line in log_file] == [valid]
+    # The rewrite leaves no temporary files behind
+    assert sorted(path.name for path in tmp_path.iterdir()
+                  if path.name.startswith(('.training', 'training'))) == ['training_log.jsonl',
+                                                                         'training_log.jsonl.lock']
+
+
+def test_stats_skip_malformed_entries(app_module):
+    hour = int(time.time() // 3600) * 3600
+    with open(app_module.STATS_LOG_PATH, 'w', encoding='utf-8') as stats_file:
+        for line in ['123', '"hour"', json.dumps({'hour': 'now', 'local': 1}),
+                     json.dumps({'hour': hour, 'local': 'many'}),
+                     json.dumps({'hour': hour, 'local': 2, 'gemini': 1})]:
+            stats_file.write(line + '\n')
+
+    assert app_module.load_answer_stats(compact=True) == {hour: {'local': 2, 'gemini': 1,
+                                                                 'audited': 0, 'audit_agreed': 0}}
+
+
+def test_init_self_training_trains_in_background(app_module, monkeypatch):
+    with open(app_module.TRAINING_LOG_PATH, 'w', encoding='utf-8') as log_file:
+        log_file.write('123\n')
+    started = []
+    monkeypatch.setattr(app_module, '_self_training_started', False)
+    monkeypatch.setattr(app_module.threading, 'Thread',
+                        lambda target, daemon: mock.Mock(start=lambda: started.append(target)))
+
+    app_module.init_self_training()
+    app_module.init_self_training()
+
+    assert started == [app_module._training_worker]
+    assert app_module.local_model.example_count == 0
+
+
+def test_detect_language_uses_gemini_until_model_is_ready(app_module, monkeypatch):
+    gemini = mock.Mock(return_value=gemini_answer('singlish'))
+    monkeypatch.setattr(app_module, 'detect_language_with_gemini', gemini)
+
+    result = app_module.detect_language('kohomada oyata')
+
+    gemini.assert_called_once_with('kohomada oyata')
+    assert result['source'] == 'gemini'
+    assert app_module._training_queue.get_nowait()['language'] == 'singlish'
+
+
+def test_detect_language_answers_locally_when_confident(app_module, bilingual_examples, monkeypatch):
+    train(app_module, bilingual_examples)
+    gemini = mock.Mock()
+    monkeypatch.setattr(app_module, 'detect_language_with_gemini', gemini)
+    monkeypatch.setattr(app_module.random, 'random', lambda: 0.99)
+
+    result = app_module.detect_language('mama gedara yanawa machan')
+
+    gemini.assert_not_called()
+    assert result['language'] == 'singlish'
+    assert result['source'] == 'local'
+
+
+def test_detect_language_audits_a_share_of_local_answers(app_module, bilingual_examples, monkeypatch):
+    train(app_module, bilingual_examples)
+    gemini = mock.Mock(return_value=gemini_answer('mixed'))
+    monkeypatch.setattr(app_module, 'detect_language_with_gemini', gemini)
+    monkeypatch.setattr(app_module.random, 'random', lambda: 0.0)
+
+    result = app_module.detect_language('mama gedara yanawa machan')
+
+    assert result['source'] == 'gemini'
+    stats = app_module.load_answer_stats()
+    [counts] = stats.values()
+    assert counts['audited'] == 1
+    assert counts['audit_agreed'] == 0
+
+
+def test_detect_language_without_gemini(app_module, bilingual_examples, monkeypatch):
+    gemini = mock.Mock()
+    monkeypatch.setattr(app_module, 'detect_language_with_gemini', gemini)
+
+    assert app_module.detect_language('mama gedara yanawa', use_gemini=False) is None
+    train(app_module, bilingual_examples)
+    assert app_module.detect_language('mama gedara yanawa', use_gemini=False)['source'] == 'local'
+    gemini.assert_not_called()
+
+
+def test_stats_are_shared_through_the_log(app_module, client, monkeypatch):
+    hour = int(time.time() // 3600) * 3600
+    with open(app_module.STATS_LOG_PATH, 'w', encoding='utf-8') as stats_file:
+        # Written by another worker
+        stats_file.write(json.dumps({'hour': hour, 'local': 3, 'gemini': 1}) + '\n')
+        stats_file.write(json.dumps({'hour': hour - 90 * 86400, 'local': 50}) + '\n')
+    app_module.record_answer_stat('gemini')
+    app_module.flush_answer_stats()
+    app_module.record_answer_stat('local')
+
+    data = client.get('/api/stats').get_json()
+
+    assert data['total_requests'] == 6
+    assert data['local_requests'] == 4
+    assert data['local_share'] == pytest.approx(4 / 6)
+    assert data['hourly'] == [{'hour': hour, 'local': 4, 'gemini': 2,
+                               'local_share': pytest.approx(4 / 6)}]
+
+    app_module.load_answer_stats(compact=True)
+    with open(app_module.STATS_LOG_PATH, encoding='utf-8') as stats_file:
+        assert len(stats_file.readlines()) == 1
+
+
+def test_detect_endpoint_answers_locally_without_api_key(app_module, client, bilingual_examples, monkeypatch):
+    monkeypatch.setattr(app_module, 'GEMINI_API_KEY', None)
+
+    response = client.post('/api/detect', json={'message': 'mama gedara yanawa'})
+    assert response.status_code == 500
+
+    train(app_module, bilingual_examples)
+    response = client.post('/api/detect', json={'message': 'mama gedara yanawa'})
+    assert response.status_code == 200
+    assert response.get_json()['source'] == 'local'
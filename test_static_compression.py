@@ -0,0 +1,243 @@
+"""
+Test-client tests for static asset caching and API response encoding.
+"""
+
+import gzip
+import json
+
+import pytest
+
+ANALYSIS = ("This text is written in Singlish (romanized Sinhala). The words 'kohomada' "
+            "(how are) and 'oyata' (you) are common Sinhala words written in English letters.")
+
+
+@pytest.fixture
+def gemini(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(app_module, 'detect_language_with_gemini',
+                        lambda text: {'language': 'singlish', 'confidence': 95.0, 'analysis': ANALYSIS})
+
+
+def detect(client, **headers):
+    return client.post('/api/detect', json={'message': 'kohomada oyata'}, headers=headers)
+
+
+def asset_url(app_module, filename):
+    return f"/static/{filename}?v={app_module.STATIC_ASSETS[filename]['digest']}"
+
+
+def test_index_links_hashed_assets(app_module, client):
+    html = client.get('/').get_data(as_text=True)
+
+    assert f'href="{asset_url(app_module, "style.css")}"' in html
+    assert f'src="{asset_url(app_module, "app.js")}"' in html
+
+
+def test_index_is_revalidated_with_etag(client):
+    response = client.get('/')
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    etag = response.headers['ETag']
+
+    revalidated = client.get('/', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+
+
+def test_etag_from_other_encoding_still_revalidates(client):
+    etag = client.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_hashed_asset_is_immutable(app_module, client):
+    response = client.get(asset_url(app_module, 'app.js'))
+
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.headers['Content-Type'].startswith(('text/javascript', 'application/javascript'))
+
+
+@pytest.mark.parametrize('url', ['/static/app.js', '/static/app.js?v=stale'])
+def test_unhashed_or_stale_asset_is_revalidated(client, url):
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+@pytest.mark.parametrize('url', ['/static/index.html', '/static/missing.js'])
+def test_unknown_assets_are_not_found(client, url):
+    assert client.get(url).status_code == 404
+
+
+def test_static_gzip_matches_identity(client):
+    plain = client.get('/static/style.css')
+    compressed = client.get('/static/style.css', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+
+
+def test_static_prefers_brotli(app_module, client, monkeypatch):
+    brotli = pytest.importorskip('brotli')
+    monkeypatch.setattr(app_module, 'brotli', brotli)
+    monkeypatch.setattr(app_module, 'STATIC_ASSETS', app_module.load_static_assets())
+
+    response = client.get('/static/style.css', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == client.get('/static/style.css').data
+
+
+def test_static_falls_back_to_gzip_without_brotli(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'brotli', None)
+    monkeypatch.setattr(app_module, 'STATIC_ASSETS', app_module.load_static_assets())
+
+    response = client.get('/static/style.css', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def write_static_dir(path, index_html, **files):
+    path.mkdir()
+    (path / 'index.html').write_text(index_html, encoding='utf-8')
+    for name, content in files.items():
+        (path / name).write_text(content, encoding='utf-8')
+    return path
+
+
+def test_load_static_assets_rewrites_any_reference_form(app_module, tmp_path):
+    static_dir = write_static_dir(
+        tmp_path / 'static',
+        "<link href='/static/a.css'><script src=./static/b.js></script><img src=\"https://example.com/c.png\">",
+        **{'a.css': 'a {}', 'b.js': 'b()'}
+    )
+
+    assets = app_module.load_static_assets(str(static_dir))
+
+    html = assets['index.html']['encodings']['identity'][0].decode('utf-8')
+    assert f"href='/static/a.css?v={assets['a.css']['digest']}'" in html
+    assert f"src=/static/b.js?v={assets['b.js']['digest']}>" in html
+    assert 'src="https://example.com/c.png"' in html
+
+
+def test_load_static_assets_skips_hidden_and_editor_files(app_module, tmp_path):
+    static_dir = write_static_dir(
+        tmp_path / 'static', '<script src="/static/app.js"></script>',
+        **{'app.js': 'x()', '.app.js.swp': 'swap', 'app.js~': 'backup'}
+    )
+    (static_dir / '.git').mkdir()
+    (static_dir / '.git' / 'HEAD').write_text('ref', encoding='utf-8')
+
+    assert sorted(app_module.load_static_assets(str(static_dir))) == ['app.js', 'index.html']
+
+
+def test_load_static_assets_includes_nested_assets(app_module, tmp_path):
+    static_dir = write_static_dir(tmp_path / 'static', '<img src="/static/images/logo.svg">')
+    (static_dir / 'images').mkdir()
+    (static_dir / 'images' / 'logo.svg').write_text('<svg/>', encoding='utf-8')
+
+    assets = app_module.load_static_assets(str(static_dir))
+
+    html = assets['index.html']['encodings']['identity'][0].decode('utf-8')
+    assert f"/static/images/logo.svg?v={assets['images/logo.svg']['digest']}" in html
+
+
+def test_unreferenced_and_nested_assets_are_revalidated(app_module, client, tmp_path, monkeypatch):
+    static_dir = write_static_dir(
+        tmp_path / 'static', '<script src="/static/app.js"></script>',
+        **{'app.js': 'x()', 'favicon.ico': 'icon'}
+    )
+    (static_dir / 'fonts').mkdir()
+    (static_dir / 'fonts' / 'body.woff2').write_text('font', encoding='utf-8')
+    monkeypatch.setattr(app_module, 'STATIC_ASSETS', app_module.load_static_assets(str(static_dir)))
+
+    for url in ['/static/favicon.ico', '/static/fonts/body.woff2']:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_api_response_above_threshold_is_gzipped(client, gemini):
+    response = detect(client, **{'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data))['analysis'] == ANALYSIS
+
+
+def test_api_response_below_threshold_is_not_compressed(app_module, client, gemini, monkeypatch):
+    monkeypatch.setattr(app_module, 'API_COMPRESS_MIN_BYTES', 10_000)
+
+    response = detect(client, **{'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['analysis'] == ANALYSIS
+
+
+def test_api_response_is_not_compressed_unless_accepted(client, gemini):
+    response = detect(client)
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['detected_language'] == 'singlish'
+
+
+def test_api_response_prefers_brotli(app_module, client, gemini, monkeypatch):
+    brotli = pytest.importorskip('brotli')
+    monkeypatch.setattr(app_module, 'brotli', brotli)
+
+    response = detect(client, **{'Accept-Encoding': 'gzip, br'})
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data))['analysis'] == ANALYSIS
+
+
+def test_api_response_uses_gzip_without_brotli(app_module, client, gemini, monkeypatch):
+    monkeypatch.setattr(app_module, 'brotli', None)
+
+    response = detect(client, **{'Accept-Encoding': 'br, gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_api_response_in_msgpack(app_module, client, gemini, monkeypatch):
+    msgpack = pytest.importorskip('msgpack')
+    monkeypatch.setattr(app_module, 'msgpack', msgpack)
+
+    response = detect(client, Accept=app_module.MSGPACK_MIMETYPE)
+
+    assert response.mimetype == app_module.MSGPACK_MIMETYPE
+    assert 'Accept' in response.headers['Vary']
+    assert msgpack.unpackb(response.data)['analysis'] == ANALYSIS
+
+
+def test_api_response_msgpack_is_compressed(app_module, client, gemini, monkeypatch):
+    msgpack = pytest.importorskip('msgpack')
+    monkeypatch.setattr(app_module, 'msgpack', msgpack)
+
+    response = detect(client, Accept=app_module.MSGPACK_MIMETYPE, **{'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert msgpack.unpackb(gzip.decompress(response.data))['analysis'] == ANALYSIS
+
+
+@pytest.mark.parametrize('accept', ['*/*', 'application/json'])
+def test_api_response_defaults_to_json(app_module, client, gemini, accept):
+    response = detect(client, Accept=accept)
+
+    assert response.mimetype == 'application/json'
+
+
+def test_api_response_is_json_without_msgpack(app_module, client, gemini, monkeypatch):
+    monkeypatch.setattr(app_module, 'msgpack', None)
+
+    response = detect(client, Accept=app_module.MSGPACK_MIMETYPE)
+
+    assert response.mimetype == 'application/json'
+    assert response.get_json()['analysis'] == ANALYSIS